@@ -1,6 +1,7 @@
 from gettext import gettext as _
 
 import os
+from functools import lru_cache
 
 from debian import deb822, debfile
 
@@ -264,6 +265,52 @@ class BasePackage822Serializer(SingleArtifactContentSerializer):
             data={k: data[v] for k, v in cls.TRANSLATION_DICT.items() if v in data}, **kwargs
         )
 
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _from822_fields(cls):
+        """
+        Return the required fields and the YesNoFields amongst the translated fields.
+
+        Returns None, if a translated field is neither a CharField nor a YesNoField, since
+        validated_data_from822 cannot mirror its validation.
+        """
+        fields = {k: cls._declared_fields[k] for k in cls.TRANSLATION_DICT}
+        if not all(isinstance(field, (CharField, YesNoField)) for field in fields.values()):
+            return None
+        required_fields = tuple(k for k, field in fields.items() if field.required)
+        yes_no_fields = frozenset(k for k, field in fields.items() if isinstance(field, YesNoField))
+        return required_fields, yes_no_fields
+
+    @classmethod
+    def validated_data_from822(cls, data):
+        """
+        Translate deb822.Package to validated data without running the serializer validation.
+
+        This mirrors the validation of the serializer fields for well formed paragraphs, like the
+        ones found in package indices. If a paragraph needs closer inspection, None is returned
+        and the serializer needs to be used instead.
+        """
+        from822_fields = cls._from822_fields()
+        if from822_fields is None:
+            return None
+        required_fields, yes_no_fields = from822_fields
+        validated_data = {}
+        for k, v in cls.TRANSLATION_DICT.items():
+            if v not in data:
+                continue
+            value = data[v].strip()
+            if not value or "\x00" in value:
+                return None
+            if k in yes_no_fields:
+                value = value.lower()
+                if value not in ("yes", "no"):
+                    return None
+                value = value == "yes"
+            validated_data[k] = value
+        if not all(k in validated_data for k in required_fields):
+            return None
+        return validated_data
+
     def to822(self, component=""):
         """Create deb822.Package object from model."""
         ret = deb822.Packages()
@@ -1,12 +1,17 @@
 import asyncio
 import aiohttp
 import os
+import re
 import shutil
 import bz2
-import gzip
 import lzma
 import gnupg
 
+try:
+    from isal import igzip as gzip
+except ImportError:
+    import gzip
+
 from collections import defaultdict
 from tempfile import NamedTemporaryFile
 from debian import deb822
@@ -66,6 +71,18 @@ from gettext import gettext as _
 
 log = logging.getLogger(__name__)
 
+# Maximum number of package and installer file indices to handle concurrently
+MAX_CONCURRENT_INDICES = 8
+
+# Chunk size used when copying (decompressed) metadata files
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Supported compression algorithms for package indices, in order of preference
+DECOMPRESSORS = {".gz": gzip, ".xz": lzma, ".bz2": bz2}
+
+# Matches a field of a Debian control file paragraph including any continuation lines
+FIELD_REGEX = re.compile(r"^([^\s:#][^\s:]*)[ \t]*:[ \t]*(.*(?:\n[ \t].*)*)", re.MULTILINE)
+
 
 class NoReleaseFile(Exception):
     """
@@ -175,7 +192,10 @@ class DebDeclarativeVersion(DeclarativeVersion):
             ArtifactDownloader(),
             DebDropFailedArtifacts(),
             ArtifactSaver(),
-            DebUpdateReleaseFileAttributes(remote=self.first_stage.remote),
+            DebUpdateReleaseFileAttributes(
+                remote=self.first_stage.remote,
+                file_references=self.first_stage.release_file_references,
+            ),
             DebUpdatePackageIndexAttributes(),
             QueryExistingContents(),
             ContentSaver(),
@@ -193,28 +213,28 @@ def _filter_split(values, filter_values, value_type):
     of values="updates/main" and filter_values="main" is considered to be set(["updates/main"]).
     If a filter value provided does not correspond to any value, a warning is logged.
     """
-    value_list = values.split()
+    value_set = set(values.split())
     if not filter_values:
-        filtered_values = value_list
+        filtered_values = value_set
     else:
-        filter_value_list = filter_values.split()
-        filtered_values = [
+        filter_value_set = set(filter_values.split())
+        filtered_values = {
             value
-            for value in value_list
-            if value in filter_value_list or os.path.basename(value) in filter_value_list
-        ]
+            for value in value_set
+            if value in filter_value_set or os.path.basename(value) in filter_value_set
+        }
 
         # Log any filter values that do not correspont to any value.
-        plain_value_list = [os.path.basename(value) for value in value_list]
-        for filter_value in filter_value_list:
-            if filter_value not in value_list and filter_value not in plain_value_list:
+        plain_value_set = {os.path.basename(value) for value in value_set}
+        for filter_value in sorted(filter_value_set):
+            if filter_value not in value_set and filter_value not in plain_value_set:
                 message = (
                     "{0}='{1}' not amongst the release file {0}s '{2}'. "
                     "This often indicates a misspelled {0} in the remote being used."
                 )
                 log.warning(_(message).format(value_type, filter_value, values))
 
-    return sorted(set(filtered_values))
+    return sorted(filtered_values)
 
 
 class DebUpdateReleaseFileAttributes(Stage):
@@ -222,12 +242,15 @@ class DebUpdateReleaseFileAttributes(Stage):
     This stage handles ReleaseFile content.
 
     It also transfers the sha256 from the artifact to the ReleaseFile content units.
+    The file references of each parsed Release file are stored in file_references by the sha256
+    of the Release file, so the first stage does not need to parse it again.
     """
 
-    def __init__(self, remote, *args, **kwargs):
+    def __init__(self, remote, file_references, *args, **kwargs):
         """Initialize DebUpdateReleaseFileAttributes stage."""
         super().__init__(*args, **kwargs)
         self.remote = remote
+        self.file_references = file_references
         self.gpgkey = remote.gpgkey
         if self.gpgkey:
             gnupghome = os.path.join(os.getcwd(), "gpg-home")
@@ -238,12 +261,33 @@ class DebUpdateReleaseFileAttributes(Stage):
                 log.warning(_("Key import failed."))
             pass
 
+    def _verify_detached(self, artifact, signature_artifact):
+        """
+        Verify the detached signature of an artifact.
+
+        Artifacts in the local file system are verified in place, so only artifacts in other
+        storage backends need to be copied to a temporary file first.
+        """
+        try:
+            path = artifact.file.path
+        except NotImplementedError:
+            with NamedTemporaryFile() as tmp_file:
+                shutil.copyfileobj(artifact.file, tmp_file, length=COPY_BUFFER_SIZE)
+                tmp_file.flush()
+                artifact.file.seek(0)
+                return self.gpg.verify_file(signature_artifact.file, tmp_file.name)
+        return self.gpg.verify_file(signature_artifact.file, path)
+
     async def run(self):
         """
         Parse ReleaseFile content units.
 
         Update release content with information obtained from its artifact.
+
+        Signatures are verified and Release files are parsed in the default executor, so neither
+        blocks the event loop.
         """
+        loop = asyncio.get_event_loop()
         with ProgressReport(message="Update ReleaseFile units", code="update.release_file") as pb:
             async for d_content in self.items():
                 if isinstance(d_content.content, ReleaseFile):
@@ -254,12 +298,12 @@ class DebUpdateReleaseFileAttributes(Stage):
                     if "Release" in da_names:
                         if "Release.gpg" in da_names:
                             if self.gpgkey:
-                                with NamedTemporaryFile() as tmp_file:
-                                    tmp_file.write(da_names["Release"].artifact.file.read())
-                                    tmp_file.flush()
-                                    verified = self.gpg.verify_file(
-                                        da_names["Release.gpg"].artifact.file, tmp_file.name
-                                    )
+                                verified = await loop.run_in_executor(
+                                    None,
+                                    self._verify_detached,
+                                    da_names["Release"].artifact,
+                                    da_names["Release.gpg"].artifact,
+                                )
                                 if verified.valid:
                                     log.info(_("Verification of Release successful."))
                                     release_file_artifact = da_names["Release"].artifact
@@ -273,7 +317,8 @@ class DebUpdateReleaseFileAttributes(Stage):
                                 release_file.relative_path = da_names["Release"].relative_path
                         else:
                             if self.gpgkey:
-                                d_content.d_artifacts.delete(da_names["Release"])
+                                # Without "Release.gpg" the "Release" file cannot be verified
+                                d_content.d_artifacts.remove(da_names.pop("Release"))
                             else:
                                 release_file_artifact = da_names["Release"].artifact
                                 release_file.relative_path = da_names["Release"].relative_path
@@ -284,7 +329,9 @@ class DebUpdateReleaseFileAttributes(Stage):
 
                     if "InRelease" in da_names:
                         if self.gpgkey:
-                            verified = self.gpg.verify_file(da_names["InRelease"].artifact.file)
+                            verified = await loop.run_in_executor(
+                                None, self.gpg.verify_file, da_names["InRelease"].artifact.file
+                            )
                             if verified.valid:
                                 log.info(_("Verification of InRelease successful."))
                                 release_file_artifact = da_names["InRelease"].artifact
@@ -301,13 +348,18 @@ class DebUpdateReleaseFileAttributes(Stage):
                         raise NoReleaseFile(distribution=release_file.distribution)
 
                     release_file.sha256 = release_file_artifact.sha256
-                    release_file_dict = deb822.Release(release_file_artifact.file)
+                    release_file_dict = await loop.run_in_executor(
+                        None, deb822.Release, release_file_artifact.file
+                    )
                     if "codename" in release_file_dict:
                         release_file.codename = release_file_dict["Codename"]
                     if "suite" in release_file_dict:
                         release_file.suite = release_file_dict["Suite"]
                     release_file.components = release_file_dict["Components"]
                     release_file.architectures = release_file_dict["Architectures"]
+                    self.file_references[release_file.sha256] = _get_file_references(
+                        release_file_dict
+                    )
                     log.debug(_("Codename: {}").format(release_file.codename))
                     log.debug(_("Components: {}").format(release_file.components))
                     log.debug(_("Architectures: {}").format(release_file.architectures))
@@ -318,6 +370,9 @@ class DebUpdateReleaseFileAttributes(Stage):
 class DebUpdatePackageIndexAttributes(Stage):  # TODO: Needs a new name
     """
     This stage handles PackageIndex content.
+
+    Decompression and validation are done in the default executor, so they do not block the
+    event loop.
     """
 
     async def run(self):
@@ -326,6 +381,7 @@ class DebUpdatePackageIndexAttributes(Stage):  # TODO: Needs a new name
 
         Ensure, that an uncompressed artifact is available.
         """
+        loop = asyncio.get_event_loop()
         with ProgressReport(message="Update PackageIndex units", code="update.packageindex") as pb:
             async for d_content in self.items():
                 if isinstance(d_content.content, PackageIndex):
@@ -339,11 +395,15 @@ class DebUpdatePackageIndexAttributes(Stage):  # TODO: Needs a new name
                     ]:
                         # No main_artifact found, uncompress one
                         relative_dir = os.path.dirname(d_content.content.relative_path)
-                        filename = _uncompress_artifact(d_content.d_artifacts, relative_dir)
+                        filename, artifact = await loop.run_in_executor(
+                            None,
+                            _uncompress_and_validate_artifact,
+                            d_content.d_artifacts,
+                            relative_dir,
+                            content.sha256,
+                        )
                         da = DeclarativeArtifact(
-                            Artifact.init_and_validate(
-                                filename, expected_digests={"sha256": content.sha256}
-                            ),
+                            artifact,
                             filename,
                             content.relative_path,
                             d_content.d_artifacts[0].remote,
@@ -355,27 +415,92 @@ class DebUpdatePackageIndexAttributes(Stage):  # TODO: Needs a new name
                 await self.put(d_content)
 
 
+def _decompression_preference(d_artifact):
+    ext = os.path.splitext(d_artifact.relative_path)[1]
+    preference = list(DECOMPRESSORS)
+    return preference.index(ext) if ext in preference else len(preference)
+
+
 def _uncompress_artifact(d_artifacts, relative_dir):
-    for d_artifact in d_artifacts:
+    for d_artifact in sorted(d_artifacts, key=_decompression_preference):
         ext = os.path.splitext(d_artifact.relative_path)[1]
-        if ext == ".gz":
-            compressor = gzip
-        elif ext == ".bz2":
-            compressor = bz2
-        elif ext == ".xz":
-            compressor = lzma
-        else:
+        compressor = DECOMPRESSORS.get(ext)
+        if compressor is None:
             log.info(_("Compression algorithm unknown for extension '{}'.").format(ext))
             continue
-        # At this point we have found a file that can be decompressed
-        with NamedTemporaryFile(delete=False) as f_out:
+        # At this point we have found a file that can be decompressed. Like pulpcore's downloaders,
+        # write it to the working directory, so saving the artifact can move it instead of copying.
+        with NamedTemporaryFile(dir=os.getcwd(), delete=False) as f_out:
             with compressor.open(d_artifact.artifact.file) as f_in:
-                shutil.copyfileobj(f_in, f_out)
+                shutil.copyfileobj(f_in, f_out, length=COPY_BUFFER_SIZE)
         return f_out.name
     # Not one artifact was suitable
     raise NoPackageIndexFile(relative_dir=relative_dir)
 
 
+def _uncompress_and_validate_artifact(d_artifacts, relative_dir, sha256):
+    filename = _uncompress_artifact(d_artifacts, relative_dir)
+    return filename, Artifact.init_and_validate(filename, expected_digests={"sha256": sha256})
+
+
+class _Paragraph(dict):
+    """
+    A paragraph of a Debian control file with case insensitive field names.
+
+    Field names are stored in lower case.
+    """
+
+    def __getitem__(self, key):
+        return super().__getitem__(key.lower())
+
+    def __contains__(self, key):
+        return super().__contains__(key.lower())
+
+    def get(self, key, default=None):
+        """
+        Return the value of the field key if present, else default.
+        """
+        return super().get(key.lower(), default)
+
+
+def _parse_paragraph(data):
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        # Like deb822, accept paragraphs in legacy encodings instead of mangling them
+        text = data.decode("latin-1")
+    return _Paragraph(
+        (match.group(1).lower(), match.group(2).rstrip()) for match in FIELD_REGEX.finditer(text)
+    )
+
+
+def _iter_paragraphs(file):
+    """
+    Iterate over the paragraphs of a Debian control file like a package index.
+
+    This is a lean replacement for deb822.Packages.iter_paragraphs. The file is read in large
+    chunks and each paragraph is returned as a plain (case insensitive) dict of strings.
+    CRLF line endings are treated like LF line endings.
+    """
+    remainder = b""
+    while True:
+        chunk = file.read(COPY_BUFFER_SIZE)
+        if not chunk:
+            break
+        # A trailing b"\r" stays in the remainder and is normalized together with the next chunk
+        data = (remainder + chunk).replace(b"\r\n", b"\n")
+        end = data.rfind(b"\n\n")
+        if end == -1:
+            remainder = data
+            continue
+        remainder = data[end + 2 :]
+        for paragraph_data in data[:end].split(b"\n\n"):
+            if paragraph_data.strip():
+                yield _parse_paragraph(paragraph_data)
+    if remainder.strip():
+        yield _parse_paragraph(remainder)
+
+
 class DebDropFailedArtifacts(Stage):
     """
     This stage removes failed failsafe artifacts.
@@ -410,6 +535,18 @@ class DebFirstStage(Stage):
         super().__init__(*args, **kwargs)
         self.remote = remote
         self.parsed_url = urlparse(remote.url)
+        # Artifact URLs are built as url_prefix + relative_path + url_suffix
+        self.url_prefix = urlunparse(
+            self.parsed_url._replace(
+                path=self.parsed_url.path.rstrip("/") + "/", params="", query="", fragment=""
+            )
+        )
+        self.url_suffix = urlunparse(
+            ("", "", "", self.parsed_url.params, self.parsed_url.query, self.parsed_url.fragment)
+        )
+        self.checksum_fields = _get_checksum_fields()
+        # File references of parsed Release files by sha256, see DebUpdateReleaseFileAttributes
+        self.release_file_references = {}
 
     async def run(self):
         """
@@ -418,6 +555,9 @@ class DebFirstStage(Stage):
         if "md5" not in settings.ALLOWED_CONTENT_CHECKSUMS and settings.FORBIDDEN_CHECKSUM_WARNINGS:
             log.warning(_(NO_MD5_WARNING_MESSAGE))
 
+        # Limit the number of package indices processed in parallel
+        self.index_semaphore = asyncio.Semaphore(MAX_CONCURRENT_INDICES)
+
         await asyncio.gather(
             *[self._handle_distribution(dist) for dist in self.remote.distributions.split()]
         )
@@ -427,11 +567,10 @@ class DebFirstStage(Stage):
         return await d_content.resolution()
 
     def _to_d_artifact(self, relative_path, data=None):
-        artifact = Artifact(**_get_checksums(data or {}))
-        url_path = os.path.join(self.parsed_url.path, relative_path)
+        artifact = Artifact(**_get_checksums(data or {}, self.checksum_fields))
         return DeclarativeFailsafeArtifact(
             artifact,
-            urlunparse(self.parsed_url._replace(path=url_path)),
+            self.url_prefix + relative_path + self.url_suffix,
             relative_path,
             self.remote,
             deferred_download=False,
@@ -461,46 +600,58 @@ class DebFirstStage(Stage):
         release_dc = DeclarativeContent(content=release_unit)
         release = await self._create_unit(release_dc)
         # Create release architectures
-        for architecture in _filter_split(
+        architectures = _filter_split(
             release_file.architectures, self.remote.architectures, "architecture"
-        ):
+        )
+        for architecture in architectures:
             release_architecture_dc = DeclarativeContent(
                 content=ReleaseArchitecture(architecture=architecture, release=release)
             )
             await self.put(release_architecture_dc)
-        # Parse release file
-        log.info(_('Parsing Release file at distribution="{}"').format(distribution))
-        release_file_dict = deb822.Release(release_file.main_artifact.file)
-        # collect file references in new dict
-        file_references = defaultdict(deb822.Deb822Dict)
-        for digest_name in ["SHA512", "SHA256", "SHA1", "MD5sum"]:
-            if digest_name in release_file_dict:
-                for unit in release_file_dict[digest_name]:
-                    file_references[unit["Name"]].update(unit)
+        release_base_path = os.path.dirname(release_file.relative_path)
+        # Reuse the file references, if the release file was parsed in this sync already
+        file_references = self.release_file_references.pop(release_file.sha256, None)
+        if file_references is None:
+            # Parse release file
+            log.info(_('Parsing Release file at distribution="{}"').format(distribution))
+            release_file_dict = await asyncio.get_event_loop().run_in_executor(
+                None, deb822.Release, release_file.main_artifact.file
+            )
+            file_references = _get_file_references(release_file_dict)
         await asyncio.gather(
             *[
-                self._handle_component(component, release, release_file, file_references)
+                self._handle_component(
+                    component,
+                    release,
+                    release_file,
+                    release_base_path,
+                    file_references,
+                    architectures,
+                )
                 for component in _filter_split(
                     release_file.components, self.remote.components, "component"
                 )
             ]
         )
 
-    async def _handle_component(self, component, release, release_file, file_references):
+    async def _handle_component(
+        self, component, release, release_file, release_base_path, file_references, architectures
+    ):
         # Create release_component
         release_component_dc = DeclarativeContent(
             content=ReleaseComponent(component=component, release=release)
         )
         release_component = await self._create_unit(release_component_dc)
-        architectures = _filter_split(
-            release_file.architectures, self.remote.architectures, "architecture"
-        )
         pending_tasks = []
         # Handle package indices
         pending_tasks.extend(
             [
                 self._handle_package_index(
-                    release_file, release_component, architecture, file_references
+                    release_file,
+                    release_base_path,
+                    release_component,
+                    architecture,
+                    file_references,
                 )
                 for architecture in architectures
             ]
@@ -511,6 +662,7 @@ class DebFirstStage(Stage):
                 [
                     self._handle_package_index(
                         release_file,
+                        release_base_path,
                         release_component,
                         architecture,
                         file_references,
@@ -524,7 +676,11 @@ class DebFirstStage(Stage):
             pending_tasks.extend(
                 [
                     self._handle_installer_file_index(
-                        release_file, release_component, architecture, file_references
+                        release_file,
+                        release_base_path,
+                        release_component,
+                        architecture,
+                        file_references,
                     )
                     for architecture in architectures
                 ]
@@ -534,160 +690,186 @@ class DebFirstStage(Stage):
         await asyncio.gather(*pending_tasks)
 
     async def _handle_package_index(
-        self, release_file, release_component, architecture, file_references, infix=""
+        self,
+        release_file,
+        release_base_path,
+        release_component,
+        architecture,
+        file_references,
+        infix="",
     ):
-        # Create package_index
-        release_base_path = os.path.dirname(release_file.relative_path)
-        if release_file.distribution[-1] == "/":
-            # Flat repo format
-            package_index_dir = ""
-        else:
-            package_index_dir = os.path.join(
-                release_component.plain_component, infix, "binary-{}".format(architecture)
-            )
-        d_artifacts = []
-        for filename in ["Packages", "Packages.gz", "Packages.xz", "Release"]:
-            path = os.path.join(package_index_dir, filename)
-            if path in file_references:
-                relative_path = os.path.join(release_base_path, path)
-                d_artifacts.append(self._to_d_artifact(relative_path, file_references[path]))
-        if not d_artifacts:
-            # No reference here, skip this component architecture combination
-            return
-        log.info(_("Downloading: {}/Packages").format(package_index_dir))
-        content_unit = PackageIndex(
-            release=release_file,
-            component=release_component.component,
-            architecture=architecture,
-            sha256=d_artifacts[0].artifact.sha256,
-            relative_path=os.path.join(release_base_path, package_index_dir, "Packages"),
-        )
-        package_index = await self._create_unit(
-            DeclarativeContent(content=content_unit, d_artifacts=d_artifacts)
-        )
-        if not package_index:
-            if self.remote.ignore_missing_package_indices:
-                log.info(_("No packages index for architecture {}. Skipping.").format(architecture))
-                return
+        async with self.index_semaphore:
+            # Create package_index
+            if release_file.distribution[-1] == "/":
+                # Flat repo format
+                package_index_dir = ""
             else:
-                relative_dir = os.path.join(release_base_path, package_index_dir)
-                raise NoPackageIndexFile(relative_dir=relative_dir)
-        # Interpret policy to download Artifacts or not
-        deferred_download = self.remote.policy != Remote.IMMEDIATE
-        # parse package_index
-        package_futures = []
-        for package_paragraph in deb822.Packages.iter_paragraphs(package_index.main_artifact.file):
-            try:
-                package_relpath = os.path.normpath(package_paragraph["Filename"])
-                package_sha256 = package_paragraph["sha256"]
-                if package_relpath.endswith(".deb"):
-                    package_class = Package
-                    serializer_class = Package822Serializer
-                elif package_relpath.endswith(".udeb"):
-                    package_class = InstallerPackage
-                    serializer_class = InstallerPackage822Serializer
-                log.debug(_("Downloading package {}").format(package_paragraph["Package"]))
-                serializer = serializer_class.from822(data=package_paragraph)
-                serializer.is_valid(raise_exception=True)
-                package_content_unit = package_class(
-                    relative_path=package_relpath,
-                    sha256=package_sha256,
-                    **serializer.validated_data,
-                )
-                package_path = os.path.join(self.parsed_url.path, package_relpath)
-                package_da = DeclarativeArtifact(
-                    artifact=Artifact(**_get_checksums(package_paragraph)),
-                    url=urlunparse(self.parsed_url._replace(path=package_path)),
-                    relative_path=package_relpath,
-                    remote=self.remote,
-                    deferred_download=deferred_download,
-                )
-                package_dc = DeclarativeContent(
-                    content=package_content_unit, d_artifacts=[package_da]
-                )
-                package_futures.append(package_dc)
-                await self.put(package_dc)
-            except KeyError:
-                log.warning(_("Ignoring invalid package paragraph. {}").format(package_paragraph))
-        # Assign packages to this release_component
-        for package_future in package_futures:
-            package = await package_future.resolution()
-            if not isinstance(package, Package):
-                # TODO repeat this for installer packages
-                continue
-            package_release_component_dc = DeclarativeContent(
-                content=PackageReleaseComponent(
-                    package=package, release_component=release_component
+                package_index_dir = os.path.join(
+                    release_component.plain_component, infix, "binary-{}".format(architecture)
                 )
+            d_artifacts = []
+            for filename in ["Packages", "Packages.gz", "Packages.xz", "Release"]:
+                path = os.path.join(package_index_dir, filename)
+                if path in file_references:
+                    relative_path = os.path.join(release_base_path, path)
+                    d_artifacts.append(self._to_d_artifact(relative_path, file_references[path]))
+            if not d_artifacts:
+                # No reference here, skip this component architecture combination
+                return
+            log.info(_("Downloading: {}/Packages").format(package_index_dir))
+            content_unit = PackageIndex(
+                release=release_file,
+                component=release_component.component,
+                architecture=architecture,
+                sha256=d_artifacts[0].artifact.sha256,
+                relative_path=os.path.join(release_base_path, package_index_dir, "Packages"),
             )
-            await self.put(package_release_component_dc)
+            package_index = await self._create_unit(
+                DeclarativeContent(content=content_unit, d_artifacts=d_artifacts)
+            )
+            if not package_index:
+                if self.remote.ignore_missing_package_indices:
+                    log.info(
+                        _("No packages index for architecture {}. Skipping.").format(architecture)
+                    )
+                    return
+                else:
+                    relative_dir = os.path.join(release_base_path, package_index_dir)
+                    raise NoPackageIndexFile(relative_dir=relative_dir)
+            # Interpret policy to download Artifacts or not
+            deferred_download = self.remote.policy != Remote.IMMEDIATE
+            # parse package_index
+            package_futures = []
+            for package_paragraph in _iter_paragraphs(package_index.main_artifact.file):
+                if "Filename" not in package_paragraph or "SHA256" not in package_paragraph:
+                    log.warning(
+                        _("Ignoring invalid package paragraph. {}").format(package_paragraph)
+                    )
+                    continue
+                try:
+                    package_relpath = os.path.normpath(package_paragraph["Filename"])
+                    package_sha256 = package_paragraph["sha256"]
+                    if package_relpath.endswith(".deb"):
+                        package_class = Package
+                        serializer_class = Package822Serializer
+                    elif package_relpath.endswith(".udeb"):
+                        package_class = InstallerPackage
+                        serializer_class = InstallerPackage822Serializer
+                    log.debug(_("Downloading package {}").format(package_paragraph["Package"]))
+                    package_data = serializer_class.validated_data_from822(package_paragraph)
+                    if package_data is None:
+                        serializer = serializer_class.from822(data=package_paragraph)
+                        serializer.is_valid(raise_exception=True)
+                        package_data = serializer.validated_data
+                    package_content_unit = package_class(
+                        relative_path=package_relpath,
+                        sha256=package_sha256,
+                        **package_data,
+                    )
+                    package_da = DeclarativeArtifact(
+                        artifact=Artifact(
+                            **_get_checksums(package_paragraph, self.checksum_fields)
+                        ),
+                        url=self.url_prefix + package_relpath + self.url_suffix,
+                        relative_path=package_relpath,
+                        remote=self.remote,
+                        deferred_download=deferred_download,
+                    )
+                    package_dc = DeclarativeContent(
+                        content=package_content_unit, d_artifacts=[package_da]
+                    )
+                    package_futures.append(package_dc)
+                    await self.put(package_dc)
+                except KeyError:
+                    log.warning(
+                        _("Ignoring invalid package paragraph. {}").format(package_paragraph)
+                    )
+            # Assign packages to this release_component, as soon as they are resolved
+            for package_resolution in asyncio.as_completed(
+                [package_future.resolution() for package_future in package_futures]
+            ):
+                package = await package_resolution
+                if not isinstance(package, Package):
+                    # TODO repeat this for installer packages
+                    continue
+                package_release_component_dc = DeclarativeContent(
+                    content=PackageReleaseComponent(
+                        package=package, release_component=release_component
+                    )
+                )
+                await self.put(package_release_component_dc)
 
     async def _handle_installer_file_index(
-        self, release_file, release_component, architecture, file_references
+        self, release_file, release_base_path, release_component, architecture, file_references
     ):
-        # Create installer file index
-        release_base_path = os.path.dirname(release_file.relative_path)
-        installer_file_index_dir = os.path.join(
-            release_component.plain_component,
-            "installer-{}".format(architecture),
-            "current",
-            "images",
-        )
-        d_artifacts = []
-        for filename in InstallerFileIndex.FILE_ALGORITHM.keys():
-            path = os.path.join(installer_file_index_dir, filename)
-            if path in file_references:
-                relative_path = os.path.join(release_base_path, path)
-                d_artifacts.append(self._to_d_artifact(relative_path, file_references[path]))
-        if not d_artifacts:
-            return
-        log.info(_("Downloading installer files from {}").format(installer_file_index_dir))
-        content_unit = InstallerFileIndex(
-            release=release_file,
-            component=release_component.component,
-            architecture=architecture,
-            sha256=d_artifacts[0].artifact.sha256,
-            relative_path=os.path.join(release_base_path, installer_file_index_dir),
-        )
-        d_content = DeclarativeContent(content=content_unit, d_artifacts=d_artifacts)
-        installer_file_index = await self._create_unit(d_content)
-        # Interpret policy to download Artifacts or not
-        deferred_download = self.remote.policy != Remote.IMMEDIATE
-        # Parse installer file index
-        file_list = defaultdict(dict)
-        for content_artifact in installer_file_index.contentartifact_set.all():
-            algorithm = InstallerFileIndex.FILE_ALGORITHM.get(
-                os.path.basename(content_artifact.relative_path)
+        async with self.index_semaphore:
+            # Create installer file index
+            installer_file_index_dir = os.path.join(
+                release_component.plain_component,
+                "installer-{}".format(architecture),
+                "current",
+                "images",
             )
-            if not algorithm:
-                continue
-            for line in content_artifact.artifact.file:
-                digest, filename = line.decode().strip().split(maxsplit=1)
-                filename = os.path.normpath(filename)
-                if filename in InstallerFileIndex.FILE_ALGORITHM:  # strangely they may appear here
-                    continue
-                file_list[filename][algorithm] = digest
-
-        for filename, digests in file_list.items():
-            relpath = os.path.join(installer_file_index.relative_path, filename)
-            urlpath = os.path.join(self.parsed_url.path, relpath)
-            content_unit = GenericContent(sha256=digests["sha256"], relative_path=relpath)
-            d_artifact = DeclarativeArtifact(
-                artifact=Artifact(**digests),
-                url=urlunparse(self.parsed_url._replace(path=urlpath)),
-                relative_path=relpath,
-                remote=self.remote,
-                deferred_download=deferred_download,
+            file_algorithm = InstallerFileIndex.FILE_ALGORITHM
+            d_artifacts = []
+            for filename in file_algorithm.keys():
+                path = os.path.join(installer_file_index_dir, filename)
+                if path in file_references:
+                    relative_path = os.path.join(release_base_path, path)
+                    d_artifacts.append(self._to_d_artifact(relative_path, file_references[path]))
+            if not d_artifacts:
+                return
+            log.info(_("Downloading installer files from {}").format(installer_file_index_dir))
+            content_unit = InstallerFileIndex(
+                release=release_file,
+                component=release_component.component,
+                architecture=architecture,
+                sha256=d_artifacts[0].artifact.sha256,
+                relative_path=os.path.join(release_base_path, installer_file_index_dir),
             )
-            d_content = DeclarativeContent(content=content_unit, d_artifacts=[d_artifact])
-            await self.put(d_content)
+            d_content = DeclarativeContent(content=content_unit, d_artifacts=d_artifacts)
+            installer_file_index = await self._create_unit(d_content)
+            # Interpret policy to download Artifacts or not
+            deferred_download = self.remote.policy != Remote.IMMEDIATE
+            # Parse installer file index
+            file_list = defaultdict(dict)
+            for content_artifact in installer_file_index.contentartifact_set.all():
+                algorithm = file_algorithm.get(os.path.basename(content_artifact.relative_path))
+                if not algorithm:
+                    continue
+                # The SUMS files are small, so read and decode them as a whole
+                for line in content_artifact.artifact.file.read().decode().splitlines():
+                    line = line.strip()
+                    if not line:
+                        continue
+                    digest, filename = line.split(maxsplit=1)
+                    filename = os.path.normpath(filename)
+                    # strangely they may appear here
+                    if filename in file_algorithm:
+                        continue
+                    file_list[filename][algorithm] = digest
+
+            for filename, digests in file_list.items():
+                relpath = os.path.join(installer_file_index.relative_path, filename)
+                content_unit = GenericContent(sha256=digests["sha256"], relative_path=relpath)
+                d_artifact = DeclarativeArtifact(
+                    artifact=Artifact(**digests),
+                    url=self.url_prefix + relpath + self.url_suffix,
+                    relative_path=relpath,
+                    remote=self.remote,
+                    deferred_download=deferred_download,
+                )
+                d_content = DeclarativeContent(content=content_unit, d_artifacts=[d_artifact])
+                await self.put(d_content)
 
-    async def _handle_translation_files(self, release_file, release_component, file_references):
+    async def _handle_translation_files(
+        self, release_file, release_base_path, release_component, file_references
+    ):
         translation_dir = os.path.join(release_component.plain_component, "i18n")
         paths = [path for path in file_references.keys() if path.startswith(translation_dir)]
         translations = {}
         for path in paths:
-            relative_path = os.path.join(os.path.dirname(release_file.relative_path), path)
+            relative_path = os.path.join(release_base_path, path)
             d_artifact = self._to_d_artifact(relative_path, file_references[path])
             key, ext = os.path.splitext(relative_path)
             if key not in translations:
@@ -703,11 +885,39 @@ class DebFirstStage(Stage):
             )
 
 
-def _get_checksums(unit_dict):
+def _get_file_references(release_file_dict):
+    """
+    Collects the checksums of all files referenced in a parsed Release file by file name.
+
+    The checksums are keyed by the Debian checksum field names used in the CHECKSUM_TYPE_MAP.
     """
-    Filters the unit_dict provided to retain only checksum fields present in the
-    CHECKSUM_TYPE_MAP and permitted by ALLOWED_CONTENT_CHECKSUMS. Also translates the
-    retained keys from Debian checksum field name to Pulp checksum type name.
+    file_references = {}
+    for digest_name in ["SHA512", "SHA256", "SHA1", "MD5sum"]:
+        if digest_name in release_file_dict:
+            for unit in release_file_dict[digest_name]:
+                reference = file_references.setdefault(unit["Name"], {})
+                reference[digest_name] = unit[digest_name]
+                reference["Size"] = unit["Size"]
+    return file_references
+
+
+def _get_checksum_fields():
+    """
+    Returns the (checksum_type, deb_field) pairs from the CHECKSUM_TYPE_MAP, that are permitted by
+    ALLOWED_CONTENT_CHECKSUMS.
+    """
+    return [
+        (checksum_type, deb_field)
+        for checksum_type, deb_field in CHECKSUM_TYPE_MAP.items()
+        if checksum_type in settings.ALLOWED_CONTENT_CHECKSUMS
+    ]
+
+
+def _get_checksums(unit_dict, checksum_fields):
+    """
+    Filters the unit_dict provided to retain only checksum fields present in checksum_fields, as
+    returned by _get_checksum_fields(). Also translates the retained keys from Debian checksum
+    field name to Pulp checksum type name.
 
     For example, if the following is in the unit_dict:
         'SHA256': '0b412f7b1a25087871c3e9f2743f4d90b9b025e415f825483b6f6a197d11d409',
@@ -719,6 +929,6 @@ def _get_checksums(unit_dict):
     """
     return {
         checksum_type: unit_dict[deb_field]
-        for checksum_type, deb_field in CHECKSUM_TYPE_MAP.items()
-        if checksum_type in settings.ALLOWED_CONTENT_CHECKSUMS and deb_field in unit_dict
+        for checksum_type, deb_field in checksum_fields
+        if deb_field in unit_dict
     }
@@ -1,7 +1,8 @@
 import unittest
+from debian import deb822
 from django.test import TestCase
 
-from pulp_deb.app.serializers import GenericContentSerializer
+from pulp_deb.app.serializers import GenericContentSerializer, Package822Serializer
 from pulp_deb.app.models import GenericContent
 
 from pulpcore.plugin.models import Artifact
@@ -36,3 +37,39 @@ class TestGenericContentSerializer(TestCase):
         data = {"_artifact": "/pulp/api/v3/artifacts/{}/".format(self.artifact.pk)}
         serializer = GenericContentSerializer(data=data)
         self.assertFalse(serializer.is_valid())
+
+
+class TestPackage822Serializer(TestCase):
+    """Test Package822Serializer."""
+
+    PACKAGE_PARAGRAPH = (
+        "Package: aegir\n"
+        "Version: 0.1-edda0\n"
+        "Architecture: sea\n"
+        "Essential: yes\n"
+        "Maintainer: Utgardloki\n"
+        "Description: A sea jötunn associated with the ocean.\n"
+        "MD5sum: aabb\n"
+        "SHA1: ccdd\n"
+        "SHA256: eeff\n"
+        "Filename: pool/a/aegir/aegir_0.1-edda0_sea.deb\n"
+    )
+
+    def test_validated_data_from822(self):
+        """Test that the fast path yields the same data as the serializer validation."""
+        package_dict = deb822.Packages(self.PACKAGE_PARAGRAPH)
+        serializer = Package822Serializer.from822(data=package_dict)
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(
+            Package822Serializer.validated_data_from822(package_dict),
+            dict(serializer.validated_data),
+        )
+
+    def test_validated_data_from822_fallback(self):
+        """Test that the fast path refuses paragraphs that need the serializer validation."""
+        package_dict = deb822.Packages(self.PACKAGE_PARAGRAPH)
+        package_dict["Essential"] = "maybe"
+        self.assertIsNone(Package822Serializer.validated_data_from822(package_dict))
+        del package_dict["Essential"]
+        del package_dict["Maintainer"]
+        self.assertIsNone(Package822Serializer.validated_data_from822(package_dict))
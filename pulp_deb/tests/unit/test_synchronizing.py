@@ -0,0 +1,83 @@
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from pulp_deb.app.tasks.synchronizing import _iter_paragraphs
+
+
+class TestIterParagraphs(TestCase):
+    """Test parsing of package indices."""
+
+    PACKAGE_INDEX = (
+        "Package: aegir\n"
+        "Version: 0.1-edda0\n"
+        "Architecture: sea\n"
+        "Maintainer: Utgardloki\n"
+        "Description: A sea jötunn associated with the ocean.\n"
+        " He is known for hosting parties.\n"
+        " .\n"
+        " And brewing ale.\n"
+        "SHA256: eeff\n"
+        "Filename: pool/a/aegir/aegir_0.1-edda0_sea.deb\n"
+        "\n"
+        "Package: ran\n"
+        "Version: 0.1-edda0\n"
+        "Description:\n"
+        " A sea goddess.\n"
+        "MD5sum: aabb\n"
+        "\n"
+        "\n"
+        "Package: hel\n"
+    ).encode()
+
+    def test_paragraphs(self):
+        """Test that all paragraphs and fields are parsed."""
+        paragraphs = list(_iter_paragraphs(BytesIO(self.PACKAGE_INDEX)))
+        self.assertEqual([p["Package"] for p in paragraphs], ["aegir", "ran", "hel"])
+        self.assertEqual(paragraphs[0]["Filename"], "pool/a/aegir/aegir_0.1-edda0_sea.deb")
+        self.assertEqual(
+            paragraphs[0]["Description"],
+            "A sea jötunn associated with the ocean.\n"
+            " He is known for hosting parties.\n"
+            " .\n"
+            " And brewing ale.",
+        )
+        self.assertEqual(paragraphs[1]["Description"], "\n A sea goddess.")
+
+    def test_crlf_line_endings(self):
+        """Test that paragraphs are split correctly in a file with CRLF line endings."""
+        package_index = self.PACKAGE_INDEX.replace(b"\n", b"\r\n")
+        paragraphs = list(_iter_paragraphs(BytesIO(package_index)))
+        self.assertEqual([p["Package"] for p in paragraphs], ["aegir", "ran", "hel"])
+        self.assertEqual(paragraphs[0]["Filename"], "pool/a/aegir/aegir_0.1-edda0_sea.deb")
+        self.assertEqual(paragraphs[1]["Description"], "\n A sea goddess.")
+
+    def test_small_chunks(self):
+        """Test that paragraphs split across read chunks are parsed correctly."""
+        expected = list(_iter_paragraphs(BytesIO(self.PACKAGE_INDEX)))
+        for package_index in [self.PACKAGE_INDEX, self.PACKAGE_INDEX.replace(b"\n", b"\r\n")]:
+            for chunk_size in range(1, 64):
+                with self.subTest(chunk_size=chunk_size), patch(
+                    "pulp_deb.app.tasks.synchronizing.COPY_BUFFER_SIZE", chunk_size
+                ):
+                    self.assertEqual(list(_iter_paragraphs(BytesIO(package_index))), expected)
+
+    def test_legacy_encoding(self):
+        """Test that paragraphs which are not UTF-8 encoded are decoded as latin-1."""
+        package_index = "Package: aegir\nMaintainer: Jörg\n".encode("latin-1")
+        paragraph = next(_iter_paragraphs(BytesIO(package_index)))
+        self.assertEqual(paragraph["Maintainer"], "Jörg")
+
+    def test_whitespace_before_colon(self):
+        """Test that whitespace between field name and colon is accepted."""
+        paragraph = next(_iter_paragraphs(BytesIO(b"Package : aegir\nVersion\t: 0.1\n")))
+        self.assertEqual(paragraph["Package"], "aegir")
+        self.assertEqual(paragraph["Version"], "0.1")
+
+    def test_case_insensitive_fields(self):
+        """Test that field names are case insensitive."""
+        paragraph = next(_iter_paragraphs(BytesIO(self.PACKAGE_INDEX)))
+        self.assertEqual(paragraph["sha256"], "eeff")
+        self.assertIn("SHA256", paragraph)
+        self.assertEqual(paragraph.get("FILENAME"), "pool/a/aegir/aegir_0.1-edda0_sea.deb")
+        self.assertNotIn("MD5sum", paragraph)
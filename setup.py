@@ -20,6 +20,7 @@ setup(
     url="https://pulpproject.org",
     python_requires=">=3.6",
     install_requires=requirements,
+    extras_require={"isal": ["isal"]},
     include_package_data=True,
     packages=find_packages(exclude=["tests", "tests.*"]),
     classifiers=(